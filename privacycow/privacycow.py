@@ -2,21 +2,20 @@
 import configparser
 import re
 import socket
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from os import environ as env
-from os import makedirs
+from os import makedirs, urandom
 from os.path import expanduser, isfile
 from random import choice, randint, randrange
 from shutil import copyfile
 
 import click
+import ijson
 import requests
-import texttable
 import urllib3.util.connection as urllib3_cn
-from faker import Faker
-from faker.providers import person
-from pkg_resources import Requirement, resource_filename
-from questionary import confirm, select, text
-from unidecode import unidecode
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 
 def read_config(file):
@@ -30,40 +29,80 @@ config_path = expanduser('~/.config/privacycow/')
 if isfile(config_path + "config.ini"):
     config = read_config(config_path + "config.ini")
 else:
+    from pkg_resources import Requirement, resource_filename
+
     makedirs(config_path, exist_ok=True)
     samplefile = resource_filename(Requirement.parse("privacycow"), "privacycow/config.ini.example")
     copyfile(samplefile, config_path + "config.ini")
     config = read_config(config_path + "config.ini")
     click.echo("Privacycow ran for the first time.\nMake sure you check your config file at %s" % config_path + "config.ini")
 
-RELAY_DOMAIN = env.get('RELAY_DOMAIN', config['DEFAULT']['RELAY_DOMAIN'])
-MAILCOW_API_KEY = env.get('MAILCOW_API_KEY')
-if not MAILCOW_API_KEY:
-    if RELAY_DOMAIN in config and 'MAILCOW_API_KEY' in config[RELAY_DOMAIN]:
-        MAILCOW_API_KEY = config[RELAY_DOMAIN]['MAILCOW_API_KEY']
-    else:
-        MAILCOW_API_KEY = config['DEFAULT']['MAILCOW_API_KEY']
-MAILCOW_INSTANCE = env.get("MAILCOW_INSTANCE")
-if not MAILCOW_INSTANCE:
-    if RELAY_DOMAIN in config and 'MAILCOW_INSTANCE' in config[RELAY_DOMAIN]:
-        MAILCOW_INSTANCE = config[RELAY_DOMAIN]['MAILCOW_INSTANCE']
-    else:
-        MAILCOW_INSTANCE = config['DEFAULT']['MAILCOW_INSTANCE']
-GOTO = env.get('GOTO')
-if not GOTO:
-    if RELAY_DOMAIN in config and 'GOTO' in config[RELAY_DOMAIN]:
-        GOTO = config[RELAY_DOMAIN]['GOTO']
-    else:
-        GOTO = config['DEFAULT']['GOTO']
-TEMPLATE = env.get('TEMPLATE')
-if not TEMPLATE:
-    if RELAY_DOMAIN in config and 'TEMPLATE' in config[RELAY_DOMAIN]:
-        TEMPLATE = config[RELAY_DOMAIN]['TEMPLATE']
-    else:
-        TEMPLATE = None
+# materialize the config once so lookups below are plain dict accesses
+CFG = {s: dict(config.items(s)) for s in [config.default_section] + config.sections()}
+
+RELAY_DOMAIN = env.get('RELAY_DOMAIN', CFG[config.default_section]['relay_domain'])
+
+
+def _cfg(key):
+    """look a setting up in the environment, the RELAY_DOMAIN section and then DEFAULT"""
+    return (env.get(key)
+            or CFG.get(RELAY_DOMAIN, {}).get(key.lower())
+            or CFG[config.default_section].get(key.lower()))
+
+
+MAILCOW_API_KEY = _cfg('MAILCOW_API_KEY')
+MAILCOW_INSTANCE = _cfg('MAILCOW_INSTANCE')
+GOTO = _cfg('GOTO')
+TEMPLATE = _cfg('TEMPLATE')
+for setting, value in (('MAILCOW_API_KEY', MAILCOW_API_KEY),
+                       ('MAILCOW_INSTANCE', MAILCOW_INSTANCE)):
+    if value is None:
+        raise SystemExit(
+            f'{setting} is not set, please add it to the [DEFAULT] or '
+            f'[{RELAY_DOMAIN}] section of {config_path}config.ini')
+
+POSSIBLE_DOMAINS = [RELAY_DOMAIN] + [s for s in config.sections() if s != RELAY_DOMAIN]
+
+# concurrent workers are capped at the pool size so no connection gets discarded
+POOL_SIZE = 10
+
+SESSION = requests.Session()
+SESSION.headers.update({'X-API-Key': MAILCOW_API_KEY})
+# retry transient gateway errors from mailcow's proxy instead of exiting,
+# the last response is still handed to raise_for_status once retries run out
+retry = Retry(total=3, backoff_factor=0.3, status_forcelist=(502, 503, 504),
+              allowed_methods=frozenset(['GET', 'POST']), raise_on_status=False)
+adapter = HTTPAdapter(max_retries=retry, pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+SESSION.mount('https://', adapter)
+SESSION.mount('http://', adapter)
+# creating an alias is not idempotent, a 504 may come back after mailcow
+# already added it, so POSTs to the add endpoints are never retried
+add_adapter = HTTPAdapter(max_retries=retry.new(allowed_methods=frozenset(['GET'])),
+                          pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+SESSION.mount(MAILCOW_INSTANCE + '/api/v1/add/', add_adapter)
 
 VOWELS = "aeiou"
 CONSONANTS = "bcdfghjklmnpqrstvwxyz"
+# every consonant+vowel pair, random bytes at or above _PAIRS_LIMIT are
+# dropped so that b % len(_PAIRS) picks each pair equally often
+_PAIRS = [c + v for c in CONSONANTS for v in VOWELS]
+_PAIRS_LIMIT = 256 - 256 % len(_PAIRS)
+
+_GENDER = {
+    'f': '_female',
+    'm': '_male',
+    'n': '_nonbinary'}
+
+# name parts in a TEMPLATE, e.g. {first_name:f:en-GB}
+_PART_RE = re.compile(r'{([\w:-]+)}')
+_NONWORD_RE = re.compile(r'[^\w]+')
+# the dot-separated lowercase usernames we generate ourselves, a strict
+# subset of _EMAIL_RE that avoids its quoted-string alternative
+_FAST_RE = re.compile(r'[a-z0-9_-]+(?:\.[a-z0-9_-]+)*')
+# check the username is valid for an email address
+# see: https://emailregex.com/
+_EMAIL_RE = re.compile(
+    r'(?:[a-z0-9!#$%&\'*+/=?^_`{|}~-]+(?:\.[a-z0-9!#$%&\'*+/=^_`{|}~-]+)*|"(?:[\x01-\x08\x0b\x0c\x0e-\x1f\x21\x23-\x5b\x5d-\x7f]|\\[\x01-\x09\x0b\x0c\x0e-\x7f])*")')
 
 
 @click.group()
@@ -81,21 +120,19 @@ def cli(ctx, debug, ):
 def list(ctx):
     """Lists all aliases with the configured privacy domain."""
     API_ENDPOINT = "/api/v1/get/alias/all"
-    headers = {'X-API-Key': MAILCOW_API_KEY}
-    possible_domains = get_possible_domains()
+    possible_domains = set(POSSIBLE_DOMAINS)
 
     try:
-        r = requests.get(MAILCOW_INSTANCE + API_ENDPOINT, headers=headers, )
+        r = SESSION.get(MAILCOW_INSTANCE + API_ENDPOINT, stream=True)
         r.raise_for_status()
     except requests.exceptions.HTTPError as err:
         raise SystemExit(err)
+    # decode the aliases one at a time as they arrive instead of loading them all
+    r.raw.decode_content = True
 
-    table = texttable.Texttable()
-    table.set_deco(texttable.Texttable.HEADER)
-    table.set_max_width(0)
-    table.header(["ID", "Alias", "Comment", "Status"])
+    rows = [("ID", "Alias", "Comment", "Status")]
 
-    for i in r.json():
+    for i in ijson.items(r.raw, 'item'):
         if i["domain"] in possible_domains:
             if i["goto"] == "null@localhost":
                 active = "Discard"
@@ -104,9 +141,13 @@ def list(ctx):
             else:
                 active = "Active"
 
-            table.add_row([i["id"], i["address"], i["public_comment"], active])
+            rows.append((str(i["id"]), i["address"], str(i["public_comment"]), active))
 
-    click.echo(table.draw())
+    widths = [max(len(cell) for cell in column) for column in zip(*rows)]
+    fmt = '  '.join(f'{{:<{width}}}' for width in widths)
+    lines = [fmt.format(*row).rstrip() for row in rows]
+    lines.insert(1, '=' * len(fmt.format(*rows[0])))
+    click.echo('\n'.join(lines))
 
 
 @cli.command()
@@ -121,8 +162,9 @@ def list(ctx):
 @click.pass_context
 def add(ctx, goto, comment, random_domain, automatic):
     """Create a new random alias."""
+    from questionary import confirm
+
     API_ENDPOINT = "/api/v1/add/alias"
-    headers = {'X-API-Key': MAILCOW_API_KEY}
 
     address, domain_to_use = (None, None) if not automatic else (
         generate_mailcow_username(), RELAY_DOMAIN)
@@ -150,7 +192,7 @@ def add(ctx, goto, comment, random_domain, automatic):
             "active": 1}
 
     try:
-        r = requests.post(MAILCOW_INSTANCE + API_ENDPOINT, headers=headers, json=data)
+        r = SESSION.post(MAILCOW_INSTANCE + API_ENDPOINT, json=data)
         r.raise_for_status()
     except requests.exceptions.HTTPError as err:
         raise SystemExit(err)
@@ -164,120 +206,165 @@ def add(ctx, goto, comment, random_domain, automatic):
 
 
 @cli.command()
-@click.argument('alias_id')
+@click.argument('alias_ids', nargs=-1, required=True)
 @click.pass_context
-def disable(ctx, alias_id):
-    """Disable a alias, done by setting the "Silently Discard" option. """
+def disable(ctx, alias_ids):
+    """Disable one or more aliases, done by setting the "Silently Discard" option. """
     API_ENDPOINT = "/api/v1/edit/alias"
-    headers = {'X-API-Key': MAILCOW_API_KEY}
 
-    data = {"items": [alias_id], "attr": {"goto_null": "1"}}
+    data = {"items": [*alias_ids], "attr": {"goto_null": "1"}}
 
     try:
-        r = requests.post(MAILCOW_INSTANCE + API_ENDPOINT, headers=headers, json=data)
+        r = SESSION.post(MAILCOW_INSTANCE + API_ENDPOINT, json=data)
         r.raise_for_status()
     except requests.exceptions.HTTPError as err:
         raise SystemExit(err)
 
-    data = r.json()
-
-    click.echo("Success! The following Alias disabled:")
-    click.echo("Alias ID:       %s" % data[0]["log"][3]["id"][0])
-    click.echo("Alias Email:    %s" % data[0]["msg"][1])
+    report_results(alias_ids, r.json(), "disabled")
 
 
 @cli.command()
-@click.argument('alias_id')
+@click.argument('alias_ids', nargs=-1, required=True)
 @click.pass_context
-def spam(ctx, alias_id):
-    """Mark all email sent to an alias as spam."""
+def spam(ctx, alias_ids):
+    """Mark all email sent to one or more aliases as spam."""
+    with ThreadPoolExecutor(max_workers=min(len(alias_ids), POOL_SIZE)) as executor:
+        futures = [executor.submit(mark_as_spam, alias_id) for alias_id in alias_ids]
+
+    # report every alias, a failure must not hide the ones that were changed
+    failed = 0
+    for alias_id, future in zip(alias_ids, futures):
+        err = future.exception()
+        if err is not None:
+            failed += 1
+            click.echo("Failed! Alias %s was not marked as spam: %s" % (alias_id, err), err=True)
+            continue
+        data = future.result()
+        click.echo("Success! The following Alias now collects spam:")
+        click.echo("Alias ID:       %s" % data[0]["log"][3]["id"][0])
+        click.echo("Alias Email:    %s" % data[0]["msg"][1])
+        click.echo("Alias Comment:  %s" % data[0]["log"][3]["public_comment"])
 
-    API_ENDPOINT = f"/api/v1/get/alias/{alias_id}"
-    headers = {'X-API-Key': MAILCOW_API_KEY}
+    if failed:
+        raise SystemExit("%d of %d aliases could not be marked as spam." % (failed, len(alias_ids)))
 
-    try:
-        r = requests.get(MAILCOW_INSTANCE + API_ENDPOINT, headers=headers, )
-        r.raise_for_status()
-    except requests.exceptions.HTTPError as err:
-        raise SystemExit(err)
 
+@cli.command()
+@click.argument('alias_ids', nargs=-1, required=True)
+@click.option('-g', '--goto', default=GOTO,
+              help='Goto address "mail@example.com". If no option is passed, GOTO env variable or config.ini will be used.')
+@click.pass_context
+def enable(ctx, alias_ids, goto):
+    """Enable one or more aliases, stop discarding email or collecting spam. """
     API_ENDPOINT = "/api/v1/edit/alias"
-    data = {
-        "items": [alias_id],
-        "attr": {
-            "goto_spam": "1",
-            "public_comment": (
-                f'spam ({r.json()["public_comment"]})')}}
+
+    data = {"items": [*alias_ids], "attr": {"goto": goto}}
 
     try:
-        r = requests.post(MAILCOW_INSTANCE + API_ENDPOINT, headers=headers, json=data)
+        r = SESSION.post(MAILCOW_INSTANCE + API_ENDPOINT, json=data)
         r.raise_for_status()
     except requests.exceptions.HTTPError as err:
         raise SystemExit(err)
 
-    data = r.json()
-
-    click.echo("Success! The following Alias now collects spam:")
-    click.echo("Alias ID:       %s" % data[0]["log"][3]["id"][0])
-    click.echo("Alias Email:    %s" % data[0]["msg"][1])
-    click.echo("Alias Comment:  %s" % data[0]["log"][3]["public_comment"])
+    report_results(alias_ids, r.json(), "enabled")
 
 
 @cli.command()
-@click.argument('alias_id')
-@click.option('-g', '--goto', default=GOTO,
-              help='Goto address "mail@example.com". If no option is passed, GOTO env variable or config.ini will be used.')
+@click.argument('alias_ids', nargs=-1, required=True)
 @click.pass_context
-def enable(ctx, alias_id, goto):
-    """Enable a alias, stop discarding email or collecting spam. """
-    API_ENDPOINT = "/api/v1/edit/alias"
-    headers = {'X-API-Key': MAILCOW_API_KEY}
+def delete(ctx, alias_ids):
+    """Delete one or more aliases."""
+
+    API_ENDPOINT = "/api/v1/delete/alias"
 
-    data = {"items": [alias_id], "attr": {"goto": goto}}
+    data = [*alias_ids]
 
     try:
-        r = requests.post(MAILCOW_INSTANCE + API_ENDPOINT, headers=headers, json=data)
+        r = SESSION.post(MAILCOW_INSTANCE + API_ENDPOINT, json=data)
         r.raise_for_status()
     except requests.exceptions.HTTPError as err:
         raise SystemExit(err)
 
-    data = r.json()
+    report_results(alias_ids, r.json(), "has been deleted")
 
-    click.echo("Success! The following Alias enabled:")
-    click.echo("Alias ID:       %s" % data[0]["log"][3]["id"][0])
-    click.echo("Alias Email:    %s" % data[0]["msg"][1])
 
+def mark_as_spam(alias_id):
+    """fetch the comment of an alias and mark it as spam"""
+    API_ENDPOINT = f"/api/v1/get/alias/{alias_id}"
 
-@cli.command()
-@click.argument('alias_id')
-@click.pass_context
-def delete(ctx, alias_id):
-    """Delete a alias."""
+    try:
+        r = SESSION.get(MAILCOW_INSTANCE + API_ENDPOINT)
+        r.raise_for_status()
+    except requests.exceptions.HTTPError as err:
+        raise SystemExit(err)
 
-    API_ENDPOINT = "/api/v1/delete/alias"
-    headers = {'X-API-Key': MAILCOW_API_KEY}
+    alias = r.json()
+    if "public_comment" not in alias:
+        raise SystemExit(f'alias {alias_id} does not exist')
 
-    data = [alias_id]
+    API_ENDPOINT = "/api/v1/edit/alias"
+    data = {
+        "items": [alias_id],
+        "attr": {
+            "goto_spam": "1",
+            "public_comment": (
+                f'spam ({alias["public_comment"]})')}}
 
     try:
-        r = requests.post(MAILCOW_INSTANCE + API_ENDPOINT, headers=headers, json=data)
+        r = SESSION.post(MAILCOW_INSTANCE + API_ENDPOINT, json=data)
         r.raise_for_status()
     except requests.exceptions.HTTPError as err:
         raise SystemExit(err)
 
     data = r.json()
+    if data[0]["type"] != "success":
+        raise SystemExit(format_message(data[0]))
+    return data
+
+
+def report_results(alias_ids, data, action):
+    """echo mailcow's result for each alias, exit non-zero if any of them failed"""
+    # mailcow answers with one message per alias, in the order they were sent
+    failed = 0
+    for n, alias_id in enumerate(alias_ids):
+        if n >= len(data):
+            failed += 1
+            click.echo("Failed! mailcow sent no result for Alias %s." % alias_id, err=True)
+        elif data[n]["type"] != "success":
+            failed += 1
+            click.echo("Failed! Alias %s: %s" % (alias_id, format_message(data[n])), err=True)
+        else:
+            click.echo("Success! The following Alias %s:" % action)
+            click.echo("Alias ID:       %s" % alias_id)
+            click.echo("Alias Email:    %s" % data[n]["msg"][1])
 
-    click.echo("Success! The following Alias has been deleted:")
-    click.echo("Alias ID:       %s" % data[0]["log"][3]["id"][0])
-    click.echo("Alias Email:    %s" % data[0]["msg"][1])
+    if failed:
+        raise SystemExit("%d of %d aliases failed." % (failed, len(alias_ids)))
+
+
+def format_message(result):
+    """return the msg of a mailcow API result as a string"""
+    msg = result["msg"]
+    return msg if isinstance(msg, str) else ' '.join(str(mmm) for mmm in msg)
 
 
 def readable_random_string(length: int) -> str:
-    string = ''
-    for x in range(int(length / 2)):
-        string += choice(CONSONANTS)
-        string += choice(VOWELS)
-    return string
+    n = length // 2
+    pairs = []
+    while len(pairs) < n:
+        pairs += [_PAIRS[b % len(_PAIRS)] for b in urandom(n) if b < _PAIRS_LIMIT]
+    return ''.join(pairs[:n])
+
+
+@lru_cache(maxsize=32)
+def _faker(lang):
+    """return a Faker instance for lang, only creating it on first use"""
+    from faker import Faker
+    from faker.providers import person
+
+    fake = Faker(lang, use_weighting=False) if lang else Faker(use_weighting=False)
+    fake.add_provider(person)
+    return fake
 
 
 def generate_realish_name(template):
@@ -303,99 +390,120 @@ def generate_realish_name(template):
 
     if the name_part is number then the user can optionally supply a lower
     and upper range like this: {number:1:100}.  a random integer between the
-    lower and upper range will be returned.  if only one range number is
+    lower and upper range will be returned, the lower range must not be
+    above the upper range.  if only one range number is
     supplied (for example {number:999}) then the number will be assumed
     to be the upper range with the lower range being 1.  if no numbers
     are provided then the range will be 0 to 1000.
     """
 
     # define mappings
-    gender = {
-        'f': '_female',
-        'm': '_male',
-        'n': '_nonbinary'}
     known = {
-        'number': [],
-        'prefix': [],
-        'first_name': [],
-        'last_name': [],
-        'suffix': []}
+        'number': set(),
+        'prefix': set(),
+        'first_name': set(),
+        'last_name': set(),
+        'suffix': set()}
 
     # find all the parts in the template that need creating
     # these are the parts between the {}
-    parts = re.findall(r'{([\w:-]+)}', template)
+    parts = _PART_RE.findall(template)
+    replacements = []
     for part in parts:
         # split the part by colon
         part = part.split(':')
         name = part[0]
-        # if the first part is not a known type then ignore it
+        # if the first part is not a known type then leave it untouched
         if name not in known.keys():
+            replacements.append(None)
             continue
-        # if we have more than one part then we have genders and
-        # languages to consider
-        if len(part) > 1:
-            sex = gender.get(part[1], '')
-            lang = part[1] if not sex else None
-            lang = part[2] if (
-                lang is None and len(part) > 2) else lang
-        else:
-            sex = ''
-            lang = None
-
-        # create a new fake identity
-        try:
-            fake = Faker(lang, use_weighting=False)
-            fake.add_provider(person)
-        except AttributeError:
-            fake = Faker(use_weighting=False)
+        sex, lang, number_range = _parse_modifiers(part)
 
         # generate the fake part
         generated = None
-        while generated is None or generated in known[name]:
-            if name == 'number':
-                if lang is None:
-                    if len(part) == 3:
-                        range = [int(ppp) for ppp in part[1:]]
-                    elif len(part) == 2:
-                        range = [0, int(part[1])]
-                    else:
-                        range = [0, 1000]
-                else:
-                    range = [int(ppp) for ppp in part]
-                range[1] += 1
-                generated = str(randrange(*range))
-            else:
+        if name == 'number':
+            while generated is None or generated in known[name]:
+                generated = str(randrange(*number_range))
+        else:
+            # create a new fake identity
+            try:
+                fake = _faker(lang)
+            except AttributeError:
+                fake = _faker(None)
+            while generated is None or generated in known[name]:
                 generated = getattr(fake, f'{name}{sex}').__call__()
-                generated = re.sub(r'[^\w]+', '', generated)
-        known[name].append(generated)
+                generated = _NONWORD_RE.sub('', generated)
+        known[name].add(generated)
+        replacements.append(generated)
 
-        # replace the part in the template
-        template = template.replace(f"{{{':'.join(part)}}}", generated, 1)
+    # replace all the parts in the template in a single pass
+    replacements = iter(replacements)
+    template = _PART_RE.sub(
+        lambda match: match.group(0) if (generated := next(replacements)) is None else generated,
+        template)
 
     # remove accented characters and make lower case
-    template = unidecode(template).lower()
+    if template.isascii():
+        template = template.lower()
+    else:
+        from unidecode import unidecode
+        template = unidecode(template).lower()
 
     # return the re-generated template string
     return validate_username(template)
 
 
+def _parse_modifiers(part):
+    """
+    split the modifiers of a template part into (sex, lang, number_range)
+
+    number_range is only set for number parts and is ready to be passed
+    to randrange, sex and lang are only set for name parts.
+    """
+    name, modifiers = part[0], part[1:]
+    if name == 'number':
+        try:
+            if len(modifiers) == 2:
+                lower, upper = (int(mmm) for mmm in modifiers)
+            elif len(modifiers) == 1:
+                lower, upper = 1, int(modifiers[0])
+            elif not modifiers:
+                lower, upper = 0, 1000
+            else:
+                raise ValueError
+            if lower > upper:
+                raise ValueError
+        except ValueError:
+            raise template_error(f"{{{':'.join(part)}}}")
+        return '', None, (lower, upper + 1)
+    if not modifiers:
+        return '', None, None
+    sex = _GENDER.get(modifiers[0], '')
+    if not sex:
+        return sex, modifiers[0], None
+    return sex, modifiers[1] if len(modifiers) > 1 else None, None
+
+
 def validate_username(template):
     """make sure the username is valid"""
-    # check the username is valid for an email address
-    # see: https://emailregex.com/
-    username = re.compile(
-        r'(?:[a-z0-9!#$%&\'*+/=?^_`{|}~-]+(?:\.[a-z0-9!#$%&\'*+/=^_`{|}~-]+)*|"(?:[\x01-\x08\x0b\x0c\x0e-\x1f\x21\x23-\x5b\x5d-\x7f]|\\[\x01-\x09\x0b\x0c\x0e-\x7f])*")')
-    if not re.fullmatch(username, template):
-        raise SystemExit(
-            'There was an error when generating a real-ish username, '
-            'please check the TEMPLATE value in your config file for '
-            f'[{RELAY_DOMAIN}] - "{template}" is not valid.')
+    if _FAST_RE.fullmatch(template):
+        return template
+    if not _EMAIL_RE.fullmatch(template):
+        raise template_error(template)
     return template
 
 
+def template_error(template):
+    """return the SystemExit raised for an invalid TEMPLATE"""
+    return SystemExit(
+        'There was an error when generating a real-ish username, '
+        'please check the TEMPLATE value in your config file for '
+        f'[{RELAY_DOMAIN}] - "{template}" is not valid.')
+
+
 def get_possible_domains():
     """return a list of possible domains"""
-    return [RELAY_DOMAIN] + [ccc for ccc in config.sections() if ccc != RELAY_DOMAIN]
+    return POSSIBLE_DOMAINS
 
 
 def generate_mailcow_username():
@@ -407,14 +515,15 @@ def generate_mailcow_username():
 
 def pick_username(template):
     """let the user pick a username"""
+    from questionary import select, text
+
     try:
-        usernames = [
+        usernames = [generate_realish_name(template) for _ in range(10)]
+        usernames += [
             generate_mailcow_username(),
             'none of these',
             'choose my own',
             'quit']
-        while len(usernames) < 13:
-            usernames.insert(0, generate_realish_name(template))
         usernames = select(
             'Which username do you want to use?',
             qmark='>',
@@ -437,6 +546,8 @@ def pick_username(template):
 
 def pick_domain():
     """let the user pick the domain"""
+    from questionary import select
+
     try:
         return select(
             'Which domain do you wish to use?',
@@ -458,6 +569,36 @@ def allowed_gai_family():
 
 urllib3_cn.allowed_gai_family = allowed_gai_family
 
+
+# This patch applies to every host urllib3 connects to in this process:
+# each host is resolved only once per run and new pool connections reuse
+# the cached addresses.
+@lru_cache(maxsize=None)
+def resolve_host(host, port):
+    """return the IPv4 addresses of host"""
+    return [sockaddr[0] for *_, sockaddr in socket.getaddrinfo(
+        host, port, socket.AF_INET, socket.SOCK_STREAM)]
+
+
+_create_connection = urllib3_cn.create_connection
+
+
+def create_connection(address, *args, **kwargs):
+    """connect to the first reachable cached IPv4 address of the host"""
+    host, port = address
+    err = None
+    for ip in resolve_host(host, port):
+        try:
+            return _create_connection((ip, port), *args, **kwargs)
+        except OSError as e:
+            err = e
+    if err is not None:
+        raise err
+    raise OSError(f'getaddrinfo returns an empty list for {host}')
+
+
+urllib3_cn.create_connection = create_connection
+
 ## Uncomment if you want to use it without installing it
 # if __name__ == '__main__':
 #     cli()
@@ -7,8 +7,9 @@ setup(
     include_package_data=True,
     install_requires=[
         'Click==8.0.1',
-        'texttable==1.6.4',
+        'ijson>=3.1',
         'requests==2.26.0',
+        'urllib3>=1.26',
         'Faker>=18.0.0',
         'Unidecode>=1.1.0',
         'questionary>=1.10.0'